@@ -0,0 +1,189 @@
+import heapq
+import math
+import time
+import threading
+from functools import wraps
+from flask import request, jsonify
+
+MAX_TRACKED_CLIENTS = 10000
+
+
+class Bulkhead:
+    """
+    Caps how many requests of one class run at once in this worker process.
+    Up to max_queue more may wait up to queue_timeout seconds for a slot; anything
+    beyond that is rejected immediately so it never ties up a worker thread.
+    """
+
+    def __init__(self, max_concurrent, max_queue=0, queue_timeout=0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Take a slot; returns False if the request should be shed"""
+        with self.condition:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return True
+
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                return False
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        return False
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout
+            }
+
+
+class RateLimiter:
+    """Per-client token bucket: `rate` requests per second on average, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}  # client -> (tokens, last refill time)
+        self.allowed = 0
+        self.limited = 0
+        self.lock = threading.Lock()
+
+    def allow(self, client):
+        """Spend a token for client. Returns: (allowed: bool, seconds until the next token)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                self.limited += 1
+            self.buckets[client] = (tokens, now)
+
+            if len(self.buckets) > MAX_TRACKED_CLIENTS:
+                self._prune(now)
+            return allowed, 0 if allowed else (1 - tokens) / self.rate
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = self.burst / self.rate
+        buckets = {
+            client: (tokens, last) for client, (tokens, last) in self.buckets.items()
+            if now - last < full_after
+        }
+        # Still too many active clients: forget the least recently seen, which only
+        # hands them a fresh burst. Halving leaves room so pruning stays infrequent.
+        if len(buckets) > MAX_TRACKED_CLIENTS // 2:
+            buckets = dict(heapq.nlargest(MAX_TRACKED_CLIENTS // 2, buckets.items(), key=lambda item: item[1][1]))
+        self.buckets = buckets
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'tracked_clients': len(self.buckets),
+                'allowed': self.allowed,
+                'limited': self.limited
+            }
+
+
+class AdmissionControl:
+    """
+    Bulkheads and rate limits for expensive endpoint classes, so a burst of
+    heavy requests is shed with 429/503 + Retry-After instead of occupying every
+    worker thread while cheap endpoints queue behind it.
+    """
+
+    def __init__(self):
+        self.bulkheads = {}
+        self.rate_limiters = {}
+        self.retry_after = {}
+
+    def init_app(self, app):
+        for name, limits in app.config['ADMISSION_LIMITS'].items():
+            self.bulkheads[name] = Bulkhead(
+                limits['concurrency'],
+                max_queue=limits.get('queue', 0),
+                queue_timeout=limits.get('queue_wait', 0)
+            )
+            self.retry_after[name] = limits.get('retry_after', 5)
+            if limits.get('rate_per_second'):
+                self.rate_limiters[name] = RateLimiter(limits['rate_per_second'], limits.get('burst', 1))
+
+    def _reject(self, status, message, retry_after):
+        response = jsonify({'error': message, 'retry_after': retry_after})
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def limit(self, name):
+        """Decorator applying the `name` endpoint class's rate limit and bulkhead"""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                rate_limiter = self.rate_limiters.get(name)
+                if rate_limiter:
+                    allowed, wait = rate_limiter.allow(request.remote_addr or 'unknown')
+                    if not allowed:
+                        return self._reject(429, 'Too many requests, please slow down', max(1, math.ceil(wait)))
+
+                bulkhead = self.bulkheads.get(name)
+                if bulkhead is None:
+                    return f(*args, **kwargs)
+
+                if not bulkhead.acquire():
+                    return self._reject(503, 'Server is busy, please try again shortly', self.retry_after[name])
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    bulkhead.release()
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            name: {
+                'bulkhead': self.bulkheads[name].stats(),
+                'rate_limit': self.rate_limiters[name].stats() if name in self.rate_limiters else None
+            }
+            for name in self.bulkheads
+        }
@@ -1,11 +1,26 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, Response
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import io
+import hashlib
 from datetime import datetime
 import json
+import mimetypes
+import tempfile
 from subtitle_scraper import SubtitleCatScraper
+from subtitle_archive import is_archive, extract_subtitles
+from subtitle_compression import ENCODING_SUFFIXES, compress_subtitle_file, compressed_path, iter_decompressed
 from video_to_srt import video_to_srt
+from transcription_cache import TranscriptionCache
+from query_analyzer import parse_release_name, tokenize
+from title_index import TitleTrigramIndex
+from video_hash import normalize_video_hash, normalize_video_size
+from storage import create_storage, filename_params, iter_chunks
+from admission import AdmissionControl
 
 # Load environment variables
 try:
@@ -22,27 +37,86 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
 app.config['VIDEO_UPLOAD_FOLDER'] = os.getenv('VIDEO_UPLOAD_FOLDER', 'video_uploads')
 app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 500 * 1024 * 1024))  # 500MB default
+app.config['TRANSCRIPTION_CACHE_FOLDER'] = os.getenv('TRANSCRIPTION_CACHE_FOLDER', 'transcription_cache')
+app.config['TRANSCRIPTION_CACHE_MAX_BYTES'] = int(os.getenv('TRANSCRIPTION_CACHE_MAX_BYTES', 200 * 1024 * 1024))  # 200MB default
+
+# File storage: 'local' keeps files in the folders above, 's3' in a bucket shared by every app node
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'local')
+app.config['S3_BUCKET'] = os.getenv('S3_BUCKET', '')
+app.config['S3_PREFIX'] = os.getenv('S3_PREFIX', '')
+app.config['S3_ENDPOINT_URL'] = os.getenv('S3_ENDPOINT_URL', '')  # For MinIO and other S3-compatible services
+app.config['S3_REGION'] = os.getenv('S3_REGION', '')
+app.config['STORAGE_REDIRECT_DOWNLOADS'] = os.getenv('STORAGE_REDIRECT_DOWNLOADS', 'true').lower() == 'true'
+app.config['STORAGE_URL_EXPIRES'] = int(os.getenv('STORAGE_URL_EXPIRES', 300))  # Seconds
+
+# Reverse proxies (nginx, the Heroku router) in front of the app; their X-Forwarded-For/-Proto
+# headers are trusted so request.remote_addr is the real client, e.g. for per-client rate limits.
+# Leave at 0 when clients connect directly, otherwise they could spoof their address.
+app.config['TRUSTED_PROXY_HOPS'] = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+if app.config['TRUSTED_PROXY_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'], x_proto=app.config['TRUSTED_PROXY_HOPS'])
+
+# Admission control for expensive endpoints (per worker process): at most `concurrency` running,
+# `queue` more waiting up to `queue_wait` seconds, the rest rejected with 503 + Retry-After.
+# Scraping endpoints are also rate limited per client IP (429 + Retry-After).
+app.config['ADMISSION_LIMITS'] = {
+    'transcode': {
+        'concurrency': int(os.getenv('TRANSCODE_CONCURRENCY', 2)),
+        'queue': int(os.getenv('TRANSCODE_QUEUE', 2)),
+        'queue_wait': float(os.getenv('TRANSCODE_QUEUE_WAIT', 5)),
+        'retry_after': 30
+    },
+    'scrape': {
+        'concurrency': int(os.getenv('SCRAPE_CONCURRENCY', 4)),
+        'queue': int(os.getenv('SCRAPE_QUEUE', 8)),
+        'queue_wait': float(os.getenv('SCRAPE_QUEUE_WAIT', 5)),
+        'retry_after': 5,
+        'rate_per_second': float(os.getenv('SCRAPE_RATE_LIMIT', 0.5)),
+        'burst': int(os.getenv('SCRAPE_RATE_BURST', 10))
+    },
+}
 
 # Ensure upload folders exist (skip on serverless platforms)
 if not os.environ.get('NETLIFY') and not os.environ.get('VERCEL'):
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(app.config['VIDEO_UPLOAD_FOLDER'], exist_ok=True)
+    if app.config['STORAGE_BACKEND'] == 'local':
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['VIDEO_UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['TRANSCRIPTION_CACHE_FOLDER'], exist_ok=True)
 
 db = SQLAlchemy(app)
 
+storage = create_storage(app.config)
+
+admission = AdmissionControl()
+admission.init_app(app)
+
+# Repeat conversions of the same media are served from here instead of re-transcribing
+transcription_cache = TranscriptionCache(
+    app.config['TRANSCRIPTION_CACHE_FOLDER'],
+    max_bytes=app.config['TRANSCRIPTION_CACHE_MAX_BYTES']
+)
+
 # Database Models
 class Subtitle(db.Model):
+    # Search resolves the title through the trigram index, then filters here by season/episode
+    __table_args__ = (
+        db.Index('ix_subtitle_title_season_episode', 'title', 'season', 'episode'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     language = db.Column(db.String(50), nullable=False)
     season = db.Column(db.Integer, nullable=True)
     episode = db.Column(db.Integer, nullable=True)
-    year = db.Column(db.Integer, nullable=True)
+    year = db.Column(db.Integer, nullable=True, index=True)
     filename = db.Column(db.String(200), nullable=False)
-    filepath = db.Column(db.String(300), nullable=False)
+    filepath = db.Column(db.String(300), nullable=False)  # Storage key, e.g. 'subtitles/<name>' (older rows: local path)
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     downloads = db.Column(db.Integer, default=0)
-    file_size = db.Column(db.Integer, nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)  # Original (uncompressed) size
+    stored_size = db.Column(db.Integer, nullable=True)  # Bytes on disk across all compressed copies
+    content_encodings = db.Column(db.String(50), nullable=True)  # e.g. 'zstd,gzip'; empty for raw files
+    video_hashes = db.relationship('SubtitleVideoHash', backref='subtitle', lazy=True)
 
     def to_dict(self):
         return {
@@ -55,14 +129,181 @@ class Subtitle(db.Model):
             'filename': self.filename,
             'upload_date': self.upload_date.strftime('%Y-%m-%d %H:%M:%S'),
             'downloads': self.downloads,
-            'file_size': self.file_size
+            'file_size': self.file_size,
+            'stored_size': self.stored_size if self.stored_size is not None else self.file_size
         }
 
+class SubtitleVideoHash(db.Model):
+    """A video file (by OpenSubtitles-style hash, see video_hash.py) that a subtitle is synced to"""
+    # The unique constraint's index doubles as the lookup index for /api/lookup-hash
+    __table_args__ = (
+        db.UniqueConstraint('video_hash', 'video_size', 'subtitle_id', name='uq_video_hash_subtitle'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    video_hash = db.Column(db.String(16), nullable=False)
+    video_size = db.Column(db.BigInteger, nullable=True)
+    subtitle_id = db.Column(db.Integer, db.ForeignKey('subtitle.id'), nullable=False)
+
+def upgrade_database():
+    """
+    Create missing tables, and the columns and indexes introduced since the database was created.
+    db.create_all() never alters existing tables, so this brings older databases up
+    to date; it is idempotent and runs at startup. New columns must be nullable.
+    """
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    
+    for table in db.metadata.sorted_tables:
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            print(f"Adding column {table.name}.{column.name}")
+            with db.engine.begin() as connection:
+                connection.execute(db.text(
+                    f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'
+                ))
+        
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                print(f"Creating index {index.name}")
+                index.create(db.engine)
+
+def parse_video_hashes(hashes, sizes):
+    """
+    Validate parallel lists of video hashes and (optional) sizes from a request.
+    Returns: (list of (hash, size) pairs or None, error message or None)
+    """
+    pairs = []
+    for i, value in enumerate(hashes):
+        video_hash = normalize_video_hash(value)
+        if not video_hash:
+            return None, f'Invalid video hash: {value}'
+        size = sizes[i] if i < len(sizes) else None
+        if size in (None, ''):
+            size = None
+        else:
+            size = normalize_video_size(size)
+            if size is None:
+                return None, f'Invalid video size: {sizes[i]}'
+        if (video_hash, size) not in pairs:
+            pairs.append((video_hash, size))
+    return pairs, None
+
+def store_subtitle(local_path, unique_filename):
+    """
+    Compress a subtitle saved at local_path and move the compressed copies into storage.
+    Returns: (storage key, original size, content_encodings, stored_size)
+    """
+    key = f"subtitles/{unique_filename}"
+    file_size = os.path.getsize(local_path)
+    content_encodings, stored_size = compress_subtitle_file(local_path)
+    for encoding in content_encodings.split(','):
+        copy_path = compressed_path(local_path, encoding)
+        storage.save_file(compressed_path(key, encoding), copy_path)
+        os.remove(copy_path)
+    return key, file_size, content_encodings, stored_size
+
+def send_stored(key, download_name, mimetype=None, content_encoding=None):
+    """
+    Send a stored object as an attachment: straight from disk for the local backend,
+    otherwise as a redirect to a presigned URL (so the bytes bypass this worker)
+    or streamed through with Range support.
+    """
+    mimetype = mimetype or mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    local_path = storage.local_path(key)
+    
+    if local_path:
+        response = send_file(local_path, mimetype=mimetype, as_attachment=True, download_name=download_name)
+    elif storage.supports_urls and app.config['STORAGE_REDIRECT_DOWNLOADS']:
+        return redirect(storage.url(
+            key,
+            expires=app.config['STORAGE_URL_EXPIRES'],
+            download_name=download_name,
+            mimetype=mimetype,
+            content_encoding=content_encoding
+        ))
+    else:
+        size = storage.size(key)
+        byte_range = request.range.range_for_length(size) if request.range else None
+        if request.range and byte_range is None:
+            raise RequestedRangeNotSatisfiable(length=size)
+        if byte_range:
+            start, stop = byte_range
+            response = Response(iter_chunks(storage.open(key, start, stop)), status=206, mimetype=mimetype)
+            response.content_range = ContentRange('bytes', start, stop, size)
+            response.content_length = stop - start
+        else:
+            response = Response(iter_chunks(storage.open(key)), mimetype=mimetype)
+            response.content_length = size
+        response.accept_ranges = 'bytes'
+        response.headers.set('Content-Disposition', 'attachment', **filename_params(download_name))
+    
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    return response
+
+# Typo-tolerant title lookup for local search; kept in step with the table by sync_title_index()
+title_index = TitleTrigramIndex()
+
+def sync_title_index():
+    """Pull subtitles added since the last sync (by any worker) into the title index"""
+    if title_index.last_row_id == 0:
+        # First load only needs one row per distinct title
+        latest_id = db.func.max(Subtitle.id)
+        rows = db.session.query(latest_id, Subtitle.title).group_by(Subtitle.title).order_by(latest_id)
+        title_index.sync(rows.yield_per(10000), track_gaps=False)
+        return
+    
+    # Rows from transactions that committed after a later id are picked up through pending_row_ids()
+    condition = Subtitle.id > title_index.last_row_id
+    pending_ids = title_index.pending_row_ids()
+    if pending_ids:
+        condition = db.or_(condition, Subtitle.id.in_(pending_ids))
+    rows = db.session.query(Subtitle.id, Subtitle.title).filter(condition).order_by(Subtitle.id)
+    title_index.sync(rows.yield_per(10000))
+
 # Routes
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@admission.limit('scrape')
+def search_subtitlecat(query, language):
+    """Search the Subtitle Cat website; throttled separately from local search"""
+    scraper = SubtitleCatScraper()
+    external_results = scraper.search(query, language)
+    
+    # Convert to our format
+    formatted_results = []
+    for result in external_results:
+        formatted_results.append({
+            'id': None,  # External results don't have IDs
+            'title': result['title'],
+            'language': result['language'],
+            'season': None,
+            'episode': None,
+            'year': result['year'],
+            'filename': f"{result['title']}.srt",
+            'upload_date': None,
+            'downloads': 0,
+            'file_size': 0,
+            'external': True,
+            'external_url': result['url'],
+            'download_url': result['download_url'],
+            'source': 'subtitlecat.com'
+        })
+    
+    return jsonify({
+        'results': formatted_results,
+        'count': len(formatted_results),
+        'source': 'subtitlecat'
+    })
+
 @app.route('/api/search', methods=['GET'])
 def search_subtitles():
     query = request.args.get('q', '').strip()
@@ -74,49 +315,65 @@ def search_subtitles():
     
     # Search from Subtitle Cat website (external source)
     if source == 'subtitlecat':
-        scraper = SubtitleCatScraper()
-        external_results = scraper.search(query, language)
-        
-        # Convert to our format
-        formatted_results = []
-        for result in external_results:
-            formatted_results.append({
-                'id': None,  # External results don't have IDs
-                'title': result['title'],
-                'language': result['language'],
-                'season': None,
-                'episode': None,
-                'year': result['year'],
-                'filename': f"{result['title']}.srt",
-                'upload_date': None,
-                'downloads': 0,
-                'file_size': 0,
-                'external': True,
-                'external_url': result['url'],
-                'download_url': result['download_url'],
-                'source': 'subtitlecat.com'
-            })
-        
-        return jsonify({
-            'results': formatted_results,
-            'count': len(formatted_results),
-            'source': 'subtitlecat'
-        })
+        return search_subtitlecat(query, language)
     
-    # Search local database
-    search_query = Subtitle.query.filter(
-        Subtitle.title.ilike(f'%{query}%')
-    )
+    # Search local database: parse release names like 'Breaking.Bad.S02E05.720p.WEB-DL'
+    parsed = parse_release_name(query)
+    search_query = Subtitle.query
+    title_rank = {}
+    
+    if parsed['title']:
+        sync_title_index()
+        titles = title_index.search(parsed['title'])
+        if not titles:
+            return jsonify({'results': [], 'count': 0, 'source': 'local', 'parsed': parsed})
+        title_rank = {title: rank for rank, title in enumerate(titles)}
+        search_query = search_query.filter(Subtitle.title.in_(titles))
+    elif parsed['season'] is None and parsed['year'] is None:
+        return jsonify({'results': [], 'count': 0, 'source': 'local', 'parsed': parsed})
+    
+    if parsed['season'] is not None:
+        search_query = search_query.filter(Subtitle.season == parsed['season'])
+    if parsed['episode'] is not None:
+        search_query = search_query.filter(Subtitle.episode == parsed['episode'])
+    
+    # A year that is part of a matched title ('Blade Runner 2049') or ends the query
+    # ('Dune 2021') only ranks results; otherwise it filters them
+    year_titles = set()
+    year_hint = False
+    if parsed['year'] is not None:
+        year_titles = {title for title in title_rank if str(parsed['year']) in tokenize(title)}
+        year_hint = bool(year_titles) or (bool(parsed['title']) and tokenize(query)[-1] == str(parsed['year']))
+        if not year_hint:
+            search_query = search_query.filter(db.or_(Subtitle.year == parsed['year'], Subtitle.year.is_(None)))
     
     if language:
         search_query = search_query.filter(Subtitle.language.ilike(f'%{language}%'))
     
-    results = search_query.order_by(Subtitle.downloads.desc()).limit(50).all()
+    # Rank in SQL before the limit, so popular near matches can't crowd out the closest title
+    ordering = []
+    if year_hint:
+        year_match = db.or_(Subtitle.year == parsed['year'], Subtitle.title.in_(year_titles))
+        ordering.append(db.case((year_match, 0), else_=1))
+    if title_rank:
+        ordering.append(db.case(title_rank, value=Subtitle.title, else_=len(title_rank)))
+    results = search_query.order_by(*ordering, Subtitle.downloads.desc()).limit(100).all()
+    
+    # Matching year hint first, then closest title, files named for the same release (720p, WEB-DL, ...), popularity
+    quality_tags = set(parsed['quality_tags'])
+    
+    def rank(subtitle):
+        tag_matches = len(quality_tags.intersection(tokenize(subtitle.filename))) if quality_tags else 0
+        year_miss = year_hint and subtitle.year != parsed['year'] and subtitle.title not in year_titles
+        return (year_miss, title_rank.get(subtitle.title, 0), -tag_matches, -subtitle.downloads)
+    
+    results = sorted(results, key=rank)[:50]
     
     return jsonify({
         'results': [subtitle.to_dict() for subtitle in results],
         'count': len(results),
-        'source': 'local'
+        'source': 'local',
+        'parsed': parsed
     })
 
 @app.route('/api/subtitles', methods=['GET'])
@@ -159,14 +416,19 @@ def upload_subtitle():
     if file_ext not in allowed_extensions:
         return jsonify({'error': 'Invalid file type. Only .srt, .vtt, .ass, .ssa, .sub files are allowed'}), 400
     
+    # Optional hashes of the video file(s) this subtitle is synced to
+    video_hashes, error = parse_video_hashes(request.form.getlist('video_hash'), request.form.getlist('video_size'))
+    if error:
+        return jsonify({'error': error}), 400
+    
     # Save file
     filename = secure_filename(file.filename)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     unique_filename = f"{timestamp}_{filename}"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-    file.save(filepath)
-    
-    file_size = os.path.getsize(filepath)
+    with tempfile.TemporaryDirectory() as work_dir:
+        temp_path = os.path.join(work_dir, unique_filename)
+        file.save(temp_path)
+        filepath, file_size, content_encodings, stored_size = store_subtitle(temp_path, unique_filename)
     
     # Create database entry
     subtitle = Subtitle(
@@ -177,8 +439,12 @@ def upload_subtitle():
         year=year,
         filename=filename,
         filepath=filepath,
-        file_size=file_size
+        file_size=file_size,
+        stored_size=stored_size,
+        content_encodings=content_encodings
     )
+    for video_hash, video_size in video_hashes:
+        subtitle.video_hashes.append(SubtitleVideoHash(video_hash=video_hash, video_size=video_size))
     
     db.session.add(subtitle)
     db.session.commit()
@@ -196,11 +462,105 @@ def download_subtitle(subtitle_id):
     subtitle.downloads += 1
     db.session.commit()
     
-    return send_file(
-        subtitle.filepath,
-        as_attachment=True,
-        download_name=subtitle.filename
+    # Rows stored before compression at rest still point at the raw file
+    if not subtitle.content_encodings:
+        return send_stored(subtitle.filepath, subtitle.filename)
+    
+    mimetype = mimetypes.guess_type(subtitle.filename)[0] or 'application/octet-stream'
+    stored_encodings = subtitle.content_encodings.split(',')
+    encoding = request.accept_encodings.best_match(
+        [encoding for encoding in ENCODING_SUFFIXES if encoding in stored_encodings]
+    )
+    
+    if encoding:
+        # Pass the stored compressed bytes straight through
+        response = send_stored(
+            compressed_path(subtitle.filepath, encoding),
+            subtitle.filename,
+            mimetype=mimetype,
+            content_encoding=encoding
+        )
+    else:
+        # Client accepts neither encoding, so decompress while streaming
+        gzip_copy = storage.open(compressed_path(subtitle.filepath, 'gzip'))
+        response = Response(iter_decompressed(gzip_copy), mimetype=mimetype)
+        response.headers.set('Content-Disposition', 'attachment', **filename_params(subtitle.filename))
+        response.headers['Content-Length'] = subtitle.file_size
+    
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/api/lookup-hash', methods=['GET'])
+def lookup_by_video_hash():
+    """Find subtitles for a local video file from its hash, without uploading the video"""
+    video_hash = normalize_video_hash(request.args.get('hash'))
+    video_size = request.args.get('size')
+    language = request.args.get('lang', '').strip()
+    
+    if not video_hash:
+        return jsonify({'error': 'A 16 character hex video hash is required'}), 400
+    
+    if video_size:
+        video_size = normalize_video_size(video_size)
+        if video_size is None:
+            return jsonify({'error': 'size must be a positive whole number of bytes'}), 400
+    else:
+        video_size = None
+    
+    search_query = Subtitle.query.join(SubtitleVideoHash).filter(SubtitleVideoHash.video_hash == video_hash)
+    
+    # The hash already folds in the size; an explicit size also rules out rare collisions
+    if video_size is not None:
+        search_query = search_query.filter(db.or_(
+            SubtitleVideoHash.video_size == video_size,
+            SubtitleVideoHash.video_size.is_(None)
+        ))
+    
+    if language:
+        search_query = search_query.filter(Subtitle.language.ilike(f'%{language}%'))
+    
+    results = search_query.order_by(Subtitle.downloads.desc()).limit(50).all()
+    
+    return jsonify({
+        'results': [subtitle.to_dict() for subtitle in results],
+        'count': len(results),
+        'source': 'local'
+    })
+
+@app.route('/api/subtitles/<int:subtitle_id>/video-hashes', methods=['POST'])
+def add_video_hashes(subtitle_id):
+    """Associate more video files with an existing subtitle"""
+    subtitle = Subtitle.query.get_or_404(subtitle_id)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    hashes = data.get('video_hashes', [])
+    if not isinstance(hashes, list) or not hashes:
+        return jsonify({'error': 'video_hashes must be a non-empty list of {hash, size} objects'}), 400
+    
+    video_hashes, error = parse_video_hashes(
+        [item.get('hash') if isinstance(item, dict) else item for item in hashes],
+        [item.get('size') if isinstance(item, dict) else None for item in hashes]
     )
+    if error:
+        return jsonify({'error': error}), 400
+    
+    existing = {(item.video_hash, item.video_size) for item in subtitle.video_hashes}
+    for video_hash, video_size in video_hashes:
+        if (video_hash, video_size) not in existing:
+            subtitle.video_hashes.append(SubtitleVideoHash(video_hash=video_hash, video_size=video_size))
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Video hashes added successfully',
+        'video_hashes': [{'hash': item.video_hash, 'size': item.video_size} for item in subtitle.video_hashes]
+    }), 201
+
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    """Admission control counters for this worker process"""
+    return jsonify(admission.stats())
 
 @app.route('/api/languages', methods=['GET'])
 def get_languages():
@@ -210,6 +570,7 @@ def get_languages():
     })
 
 @app.route('/api/import-from-subtitlecat', methods=['POST'])
+@admission.limit('scrape')
 def import_from_subtitlecat():
     """Import a subtitle from Subtitle Cat website and save it locally"""
     data = request.get_json()
@@ -232,15 +593,57 @@ def import_from_subtitlecat():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{safe_title}.srt"
         unique_filename = f"{timestamp}_{safe_title}.srt"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        
-        # Download the subtitle
-        success = scraper.download_subtitle(subtitle_url, filepath)
-        
-        if not success or not os.path.exists(filepath):
-            return jsonify({'error': 'Failed to download subtitle file'}), 400
         
-        file_size = os.path.getsize(filepath)
+        with tempfile.TemporaryDirectory() as work_dir:
+            download_path = os.path.join(work_dir, unique_filename)
+            
+            # Download the subtitle
+            success = scraper.download_subtitle(subtitle_url, download_path)
+            
+            if not success or not os.path.exists(download_path):
+                return jsonify({'error': 'Failed to download subtitle file'}), 400
+            
+            # Archives (.zip/.rar packs) are unpacked into one row per subtitle
+            if is_archive(download_path):
+                extract_dir = os.path.join(work_dir, 'extracted')
+                os.makedirs(extract_dir)
+                extracted = extract_subtitles(
+                    download_path,
+                    extract_dir,
+                    language=language,
+                    title=title,
+                    prefix=f"{timestamp}_"
+                )
+                
+                if not extracted:
+                    return jsonify({'error': 'Archive does not contain any subtitle files'}), 400
+                
+                subtitles = []
+                for member in extracted:
+                    filepath, file_size, content_encodings, stored_size = store_subtitle(
+                        member['filepath'], os.path.basename(member['filepath'])
+                    )
+                    subtitles.append(Subtitle(
+                        title=title,
+                        language=member['language'] or language,
+                        year=year,
+                        filename=member['filename'],
+                        filepath=filepath,
+                        file_size=file_size,
+                        stored_size=stored_size,
+                        content_encodings=content_encodings
+                    ))
+                
+                db.session.add_all(subtitles)
+                db.session.commit()
+                
+                return jsonify({
+                    'message': f'Imported {len(subtitles)} subtitle(s) from archive',
+                    'subtitle': subtitles[0].to_dict(),
+                    'subtitles': [subtitle.to_dict() for subtitle in subtitles]
+                }), 201
+            
+            filepath, file_size, content_encodings, stored_size = store_subtitle(download_path, unique_filename)
         
         # Create database entry
         subtitle = Subtitle(
@@ -249,7 +652,9 @@ def import_from_subtitlecat():
             year=year,
             filename=filename,
             filepath=filepath,
-            file_size=file_size
+            file_size=file_size,
+            stored_size=stored_size,
+            content_encodings=content_encodings
         )
         
         db.session.add(subtitle)
@@ -264,6 +669,7 @@ def import_from_subtitlecat():
         return jsonify({'error': f'Error importing subtitle: {str(e)}'}), 500
 
 @app.route('/api/download-external', methods=['POST'])
+@admission.limit('scrape')
 def download_external_subtitle():
     """Download a subtitle directly from external source"""
     data = request.get_json()
@@ -276,20 +682,40 @@ def download_external_subtitle():
     try:
         scraper = SubtitleCatScraper()
         
-        # Create temp file path
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        temp_filename = f"{timestamp}_{secure_filename(filename)}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
-        
-        # Download the subtitle
-        success = scraper.download_subtitle(download_url, filepath)
-        
-        if not success or not os.path.exists(filepath):
-            return jsonify({'error': 'Failed to download subtitle file'}), 400
+        # Nothing is kept, so the file only passes through a temporary folder
+        with tempfile.TemporaryDirectory() as work_dir:
+            filepath = os.path.join(work_dir, secure_filename(filename) or 'subtitle.srt')
+            
+            # Download the subtitle
+            success = scraper.download_subtitle(download_url, filepath)
+            
+            if not success or not os.path.exists(filepath):
+                return jsonify({'error': 'Failed to download subtitle file'}), 400
+            
+            # Send only the best-matching subtitle out of an archive
+            if is_archive(filepath):
+                extract_dir = os.path.join(work_dir, 'extracted')
+                os.makedirs(extract_dir)
+                extracted = extract_subtitles(
+                    filepath,
+                    extract_dir,
+                    title=os.path.splitext(filename)[0],
+                    limit=1
+                )
+                
+                if not extracted:
+                    return jsonify({'error': 'Archive does not contain any subtitle files'}), 400
+                
+                filepath = extracted[0]['filepath']
+                filename = extracted[0]['filename']
+            
+            with open(filepath, 'rb') as f:
+                data = f.read()
         
         # Send file to user
         return send_file(
-            filepath,
+            io.BytesIO(data),
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
             as_attachment=True,
             download_name=filename
         )
@@ -298,6 +724,7 @@ def download_external_subtitle():
         return jsonify({'error': f'Error downloading subtitle: {str(e)}'}), 500
 
 @app.route('/api/video-to-srt', methods=['POST'])
+@admission.limit('transcode')
 def convert_video_to_srt():
     """Convert uploaded video file to SRT subtitle file"""
     if 'video' not in request.files:
@@ -316,29 +743,36 @@ def convert_video_to_srt():
         return jsonify({'error': 'Invalid video file type. Supported: .mp4, .avi, .mov, .mkv, .wmv, .flv, .webm, .m4v'}), 400
     
     try:
-        # Save video file
         filename = secure_filename(video_file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         video_filename = f"{timestamp}_{filename}"
-        video_path = os.path.join(app.config['VIDEO_UPLOAD_FOLDER'], video_filename)
-        video_file.save(video_path)
-        
-        # Generate SRT filename
         srt_filename = os.path.splitext(video_filename)[0] + '.srt'
-        srt_path = os.path.join(app.config['VIDEO_UPLOAD_FOLDER'], srt_filename)
-        
-        # Convert video to SRT
-        success, message = video_to_srt(video_path, srt_path, language)
         
-        if not success:
-            # Clean up video file on error
-            if os.path.exists(video_path):
-                os.remove(video_path)
-            return jsonify({'error': message}), 500
+        # FFmpeg needs real files, so work in a temporary folder and keep the results in storage
+        with tempfile.TemporaryDirectory() as work_dir:
+            video_path = os.path.join(work_dir, video_filename)
+            video_file.save(video_path)
+            srt_path = os.path.join(work_dir, srt_filename)
+            
+            # Convert video to SRT
+            success, message = video_to_srt(video_path, srt_path, language, cache=transcription_cache)
+            
+            if not success:
+                return jsonify({'error': message}), 500
+            
+            with open(srt_path, 'rb') as f:
+                srt_data = f.read()
+            
+            # Keep the generated SRT (not the source video) under a content-addressed key,
+            # so repeat conversions of the same media write nothing new
+            derived_key = f"derived/{hashlib.sha256(srt_data).hexdigest()}.srt"
+            if not storage.exists(derived_key):
+                storage.save_file(derived_key, srt_path)
         
         # Return SRT file for download
         return send_file(
-            srt_path,
+            io.BytesIO(srt_data),
+            mimetype=mimetypes.guess_type(srt_filename)[0] or 'application/octet-stream',
             as_attachment=True,
             download_name=srt_filename
         )
@@ -348,6 +782,6 @@ def convert_video_to_srt():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade_database()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
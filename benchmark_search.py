@@ -0,0 +1,129 @@
+"""
+Benchmark for local /api/search on a large generated catalog
+
+Usage: python benchmark_search.py [--rows 1000000] [--titles 50000] [--repeat 200]
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+WORDS = (
+    'breaking bad dark game thrones office friends lost house crown stranger things wire '
+    'sopranos mad men true detective fargo westworld succession ozark better call saul '
+    'last kingdom vikings boys expanse mandalorian witcher chernobyl dexter homeland '
+    'sherlock luther black mirror peaky blinders narcos mindhunter severance bear '
+    'night city river shadow empire silent blood winter summer fire storm ghost iron '
+    'golden broken hidden final lost secret wild dead red blue green north south'
+).split()
+LANGUAGES = ['English', 'Spanish', 'French', 'German', 'Italian', 'Portuguese']
+RELEASES = ['720p.WEB-DL', '1080p.BluRay.x264', '2160p.WEBRip.x265', 'HDTV.x264', '1080p.AMZN.WEB-DL']
+
+QUERIES = [
+    'Breaking Bad',
+    'Breaking.Bad.S02E05.720p.WEB-DL',
+    'braking bad s2e5',
+    'The Crown 2016',
+    'game of thrones season 3 episode 9',
+    'peaky blindrs',
+    'Stranger.Things.S04E01.1080p.NF.WEB-DL.DDP5.1.x264',
+    'mindhunter',
+    'Blade Runner 2049',
+]
+
+
+KNOWN_TITLES = {
+    'Breaking Bad': 2008,
+    'The Crown': 2016,
+    'Game of Thrones': 2011,
+    'Peaky Blinders': 2013,
+    'Stranger Things': 2016,
+    'Mindhunter': 2017,
+    'Blade Runner': 1982,
+    'Blade Runner 2049': 2017,
+}
+
+
+def make_titles(count, rng):
+    """Return {title: year}: a few real shows plus random word combinations"""
+    titles = dict(KNOWN_TITLES)
+    while len(titles) < count:
+        length = rng.randint(1, 4)
+        title = ' '.join(rng.choice(WORDS).capitalize() for _ in range(length)) + f' {rng.randint(1, 999)}'
+        titles.setdefault(title, rng.randint(1990, 2024))
+    return titles
+
+
+def populate(db_path, rows, title_count, rng):
+    titles = make_titles(title_count, rng)
+    title_list = sorted(titles)
+    connection = sqlite3.connect(db_path)
+
+    def generate():
+        for i in range(rows):
+            title = title_list[i % len(title_list)]
+            season = rng.randint(1, 8)
+            episode = rng.randint(1, 20)
+            release = rng.choice(RELEASES)
+            filename = f"{title.replace(' ', '.')}.S{season:02d}E{episode:02d}.{release}.srt"
+            yield (title, rng.choice(LANGUAGES), season, episode, titles[title],
+                   filename, filename, '2024-01-01 00:00:00', rng.randint(0, 5000), 30000)
+
+    connection.executemany(
+        'INSERT INTO subtitle (title, language, season, episode, year, filename, filepath, '
+        'upload_date, downloads, file_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        generate()
+    )
+    connection.commit()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--titles', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='subtitlefox-bench-')
+    db_path = os.path.join(work_dir, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    for folder in ('UPLOAD_FOLDER', 'VIDEO_UPLOAD_FOLDER', 'TRANSCRIPTION_CACHE_FOLDER'):
+        os.environ[folder] = os.path.join(work_dir, folder.lower())
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import app, db, sync_title_index
+
+    with app.app_context():
+        db.create_all()
+
+    rng = random.Random(42)
+    start = time.perf_counter()
+    populate(db_path, args.rows, args.titles, rng)
+    print(f"Generated {args.rows:,} rows / {args.titles:,} titles in {time.perf_counter() - start:.1f}s")
+
+    with app.app_context():
+        start = time.perf_counter()
+        sync_title_index()
+        print(f"Built title index in {time.perf_counter() - start:.1f}s")
+
+    client = app.test_client()
+    print(f"\n{'query':<55} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = client.get('/api/search', query_string={'q': query})
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        hits = response.get_json()['count']
+        p50 = timings[len(timings) // 2]
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{query:<55} {hits:>5} {p50:>8.2f} {p95:>8.2f} {timings[-1]:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 # Gunicorn configuration file for production deployment
+import os
 import multiprocessing
 
 # Server socket
@@ -7,7 +8,17 @@ backlog = 2048
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Threaded workers, so cheap requests keep being served while a worker's heavy
+# requests (video conversion, Subtitle Cat fetches) run; app.py's admission
+# control caps how many of those threads the heavy endpoints may take
+worker_class = "gthread"
+# Threads the heavy classes can hold at once (running + queued), read from the same settings
+# as app.py's ADMISSION_LIMITS; the reserved threads stay free for cheap requests
+heavy_threads = sum(int(os.getenv(name, default)) for name, default in (
+    ('TRANSCODE_CONCURRENCY', 2), ('TRANSCODE_QUEUE', 2),
+    ('SCRAPE_CONCURRENCY', 4), ('SCRAPE_QUEUE', 8),
+))
+threads = int(os.getenv('GUNICORN_THREADS', heavy_threads + int(os.getenv('GUNICORN_RESERVED_THREADS', 8))))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -29,6 +40,13 @@ user = None
 group = None
 tmp_upload_dir = None
 
+# Bring the database schema up to date once, in the master, before any worker starts
+def on_starting(server):
+    from app import app, db, upgrade_database
+    with app.app_context():
+        upgrade_database()
+        db.engine.dispose()  # Workers are forked from this process, so don't hand them its connections
+
 # SSL (uncomment and configure if using HTTPS)
 # keyfile = "/path/to/keyfile"
 # certfile = "/path/to/certfile"
@@ -0,0 +1,100 @@
+import re
+
+# Release-name tokens that mark the end of the title (after normalization, see tokenize)
+QUALITY_TAGS = {
+    '480p', '576p', '720p', '1080p', '1080i', '2160p', '4k', 'uhd', 'hdr', 'hdr10', 'dv', '10bit',
+    'webdl', 'webrip', 'web', 'bluray', 'bdrip', 'brrip', 'bdremux', 'remux', 'dvdrip', 'dvdscr',
+    'hdtv', 'hdrip', 'pdtv', 'cam', 'hdcam', 'ts', 'telesync',
+    'x264', 'x265', 'h264', 'h265', 'hevc', 'avc', 'xvid', 'divx',
+    'aac', 'ac3', 'eac3', 'dts', 'ddp5', 'dd5', 'atmos', 'truehd', 'flac',
+    'proper', 'repack', 'internal', 'extended', 'unrated', 'remastered', 'limited',
+    'amzn', 'nf', 'dsnp', 'hmax', 'atvp', 'hulu',
+}
+
+# Tags that are also ordinary title words ('Charlotte's Web', 'Limited Partners')
+AMBIGUOUS_TAGS = {'web', 'cam', 'ts', 'dv', 'nf', 'hulu', 'proper', 'internal', 'extended', 'limited', 'remastered', 'atmos'}
+
+# Multi-part tags that the tokenizer would otherwise split apart
+JOINED_TAGS = {
+    'web-dl': 'webdl',
+    'web dl': 'webdl',
+    'blu-ray': 'bluray',
+    'h.264': 'h264',
+    'h.265': 'h265',
+    'dd5.1': 'dd5',
+    'ddp5.1': 'ddp5',
+}
+
+SEASON_EPISODE_PATTERN = re.compile(r'^s(\d{1,2})(?:e(\d{1,3}))?(?:e\d{1,3})*$')
+CROSS_EPISODE_PATTERN = re.compile(r'^(\d{1,2})x(\d{1,3})$')
+YEAR_PATTERN = re.compile(r'^(19|20)\d{2}$')
+
+
+def tokenize(query):
+    """Lowercase alphanumeric tokens, with multi-part tags like WEB-DL joined into one"""
+    text = query.lower()
+    for joined, tag in JOINED_TAGS.items():
+        text = text.replace(joined, tag)
+    return [t for t in re.split(r'[^a-z0-9]+', text) if t]
+
+
+def parse_release_name(query):
+    """
+    Split a search query or pasted release name into its parts, e.g.
+    'Breaking.Bad.S02E05.720p.WEB-DL' -> title 'breaking bad', season 2, episode 5, tags ['720p', 'webdl'].
+    The title is everything before the first season/episode, year or quality token.
+    Returns: dict with title, season, episode, year and quality_tags
+    """
+    tokens = tokenize(query)
+    season = None
+    episode = None
+    year = None
+    quality_tags = []
+    title_end = len(tokens)
+
+    # The last year-like token is the year, unless it is the whole title ('1917'). One that ends
+    # the query may still belong to the title ('Blade Runner 2049'); search only ranks by it then
+    for i in range(len(tokens) - 1, 0, -1):
+        if YEAR_PATTERN.match(tokens[i]):
+            year = int(tokens[i])
+            title_end = i
+            break
+
+    i = 0
+    while i < len(tokens):
+        start = i
+        token = tokens[i]
+        next_token = tokens[i + 1] if i + 1 < len(tokens) else ''
+        marker = False
+
+        match = SEASON_EPISODE_PATTERN.match(token) or CROSS_EPISODE_PATTERN.match(token)
+        if match and season is None:
+            season = int(match.group(1))
+            if match.group(2):
+                episode = int(match.group(2))
+            marker = True
+        elif token == 'season' and next_token.isdigit():
+            season = int(next_token)
+            marker = True
+            i += 1
+        elif token in ('episode', 'ep') and next_token.isdigit():
+            episode = int(next_token)
+            marker = True
+            i += 1
+        elif token in QUALITY_TAGS and i > 0:
+            # Words like 'web' or 'limited' only count once we're already past the title
+            if token not in AMBIGUOUS_TAGS or i >= title_end:
+                quality_tags.append(token)
+                marker = True
+
+        if marker:
+            title_end = min(title_end, start)
+        i += 1
+
+    return {
+        'title': ' '.join(tokens[:title_end]),
+        'season': season,
+        'episode': episode,
+        'year': year,
+        'quality_tags': quality_tags
+    }
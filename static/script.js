@@ -33,6 +33,17 @@ function setupEventListeners() {
         });
     }
 
+    // Video file hash lookup
+    const hashLookupInput = document.getElementById('hash-lookup-input');
+    if (hashLookupInput) {
+        hashLookupInput.addEventListener('change', function(e) {
+            if (e.target.files.length > 0) {
+                lookupByVideoFile(e.target.files[0]);
+                e.target.value = '';
+            }
+        });
+    }
+
     // Upload form submit
     const uploadForm = document.getElementById('upload-form');
     if (uploadForm) {
@@ -214,6 +225,66 @@ async function performSearch() {
     }
 }
 
+// Compute the OpenSubtitles-style hash of a local video: its size plus the
+// 64-bit little-endian words of its first and last 64 KB (see video_hash.py)
+async function computeVideoHash(file) {
+    const chunkSize = 64 * 1024;
+    if (file.size < chunkSize) {
+        throw new Error('File is too small to hash');
+    }
+
+    const head = await file.slice(0, chunkSize).arrayBuffer();
+    const tail = await file.slice(file.size - chunkSize).arrayBuffer();
+
+    let hash = BigInt(file.size);
+    for (const buffer of [head, tail]) {
+        const view = new DataView(buffer);
+        for (let i = 0; i < chunkSize; i += 8) {
+            hash = BigInt.asUintN(64, hash + view.getBigUint64(i, true));
+        }
+    }
+    return hash.toString(16).padStart(16, '0');
+}
+
+// Find subtitles for a local video file by its hash
+async function lookupByVideoFile(file) {
+    const language = document.getElementById('language-filter').value;
+    const resultsContainer = document.getElementById('results-container');
+
+    resultsContainer.innerHTML = `
+        <div class="loading">
+            <i class="fas fa-spinner"></i>
+            <p>Matching ${escapeHtml(file.name)}...</p>
+        </div>
+    `;
+
+    try {
+        const videoHash = await computeVideoHash(file);
+        let url = `/api/lookup-hash?hash=${videoHash}&size=${file.size}`;
+        if (language) {
+            url += `&lang=${encodeURIComponent(language)}`;
+        }
+
+        const response = await fetch(url);
+        const data = await response.json();
+
+        if (data.error) {
+            throw new Error(data.error);
+        }
+
+        displayResults(data.results || [], 'local');
+
+    } catch (error) {
+        console.error('Hash lookup error:', error);
+        resultsContainer.innerHTML = `
+            <div class="empty-state">
+                <i class="fas fa-exclamation-circle"></i>
+                <p>Error matching video file: ${escapeHtml(error.message)}</p>
+            </div>
+        `;
+    }
+}
+
 // Display search results
 function displayResults(results, source = 'local') {
     const resultsContainer = document.getElementById('results-container');
@@ -282,39 +353,16 @@ function displayResults(results, source = 'local') {
 }
 
 // Download subtitle
-async function downloadSubtitle(id) {
-    try {
-        const response = await fetch(`/api/download/${id}`);
-        if (!response.ok) {
-            throw new Error('Download failed');
-        }
-
-        const blob = await response.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        
-        const contentDisposition = response.headers.get('Content-Disposition');
-        let filename = 'subtitle.srt';
-        if (contentDisposition) {
-            const filenameMatch = contentDisposition.match(/filename="?(.+)"?/);
-            if (filenameMatch) {
-                filename = filenameMatch[1];
-            }
-        }
-        
-        a.download = filename;
-        document.body.appendChild(a);
-        a.click();
-        document.body.removeChild(a);
-        window.URL.revokeObjectURL(url);
-
-        performSearch();
-
-    } catch (error) {
-        console.error('Download error:', error);
-        alert('Error downloading subtitle. Please try again.');
-    }
+function downloadSubtitle(id) {
+    // Let the browser follow the download itself: the server may redirect to a
+    // presigned storage URL, which fetch() could not read across origins
+    const a = document.createElement('a');
+    a.href = `/api/download/${id}`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+
+    performSearch();
 }
 
 // Download external subtitle
@@ -375,7 +423,7 @@ async function importSubtitle(url, title, language, year) {
         const data = await response.json();
 
         if (response.ok) {
-            alert('Subtitle imported successfully!');
+            alert(data.message || 'Subtitle imported successfully!');
             performSearch();
         } else {
             throw new Error(data.error || 'Import failed');
@@ -417,6 +465,18 @@ async function handleUpload(e) {
     if (season) formData.append('season', season);
     if (episode) formData.append('episode', episode);
 
+    // Send only the hash of the matching video, never the video itself
+    const videoMatchInput = document.getElementById('upload-video-match');
+    if (videoMatchInput && videoMatchInput.files[0]) {
+        try {
+            formData.append('video_hash', await computeVideoHash(videoMatchInput.files[0]));
+            formData.append('video_size', videoMatchInput.files[0].size);
+        } catch (error) {
+            showMessage(error.message, 'error');
+            return;
+        }
+    }
+
     const messageDiv = document.getElementById('upload-message');
     messageDiv.className = 'message';
     messageDiv.textContent = 'Uploading...';
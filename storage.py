@@ -0,0 +1,192 @@
+import os
+import shutil
+import unicodedata
+from urllib.parse import quote
+from werkzeug.http import dump_options_header
+
+CHUNK_SIZE = 64 * 1024
+
+
+class LocalStorage:
+    """
+    Stores objects on the local filesystem. Keys look like 'subtitles/<name>';
+    the first segment picks the folder (e.g. UPLOAD_FOLDER) the object lives in.
+    Keys without a known namespace are plain paths, as stored by older rows.
+    """
+
+    supports_urls = False
+
+    def __init__(self, folders):
+        self.folders = folders
+
+    def local_path(self, key):
+        namespace, _, name = key.partition('/')
+        if namespace in self.folders and name:
+            return os.path.join(self.folders[namespace], name)
+        return key
+
+    def save(self, key, fileobj):
+        """Stream fileobj into storage; returns bytes written"""
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f, CHUNK_SIZE)
+        return os.path.getsize(path)
+
+    def save_file(self, key, source_path):
+        with open(source_path, 'rb') as f:
+            return self.save(key, f)
+
+    def open(self, key, start=None, end=None):
+        """Open an object for streaming reads, optionally only bytes [start, end)"""
+        f = open(self.local_path(key), 'rb')
+        if start is None:
+            return f
+        f.seek(start)
+        return _LimitedReader(f, end - start)
+
+    def size(self, key):
+        return os.path.getsize(self.local_path(key))
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def url(self, key, expires=300, download_name=None, mimetype=None, content_encoding=None):
+        return None
+
+
+class S3Storage:
+    """
+    Stores objects in an S3-compatible bucket (AWS S3, MinIO, R2, ...), so any app
+    node can serve any file. Downloads can be handed off to presigned URLs so the
+    bytes never pass through the app workers.
+    """
+
+    supports_urls = True
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None):
+        # boto3 is only needed when this backend is configured
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def local_path(self, key):
+        return None
+
+    def save(self, key, fileobj):
+        """Stream fileobj into the bucket (multipart for large objects); returns bytes written"""
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key))
+        return self.size(key)
+
+    def save_file(self, key, source_path):
+        self.client.upload_file(source_path, self.bucket, self._key(key))
+        return os.path.getsize(source_path)
+
+    def open(self, key, start=None, end=None):
+        """Open an object for streaming reads, optionally only bytes [start, end)"""
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if start is not None:
+            params['Range'] = f'bytes={start}-{end - 1}'
+        return self.client.get_object(**params)['Body']
+
+    def size(self, key):
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(key))['ContentLength']
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def url(self, key, expires=300, download_name=None, mimetype=None, content_encoding=None):
+        """Presigned GET URL; response headers are overridden so the browser saves the file properly"""
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if download_name:
+            params['ResponseContentDisposition'] = dump_options_header('attachment', filename_params(download_name))
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        if content_encoding:
+            params['ResponseContentEncoding'] = content_encoding
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
+
+
+class _LimitedReader:
+    """File wrapper that stops after `remaining` bytes, for range reads"""
+
+    def __init__(self, f, remaining):
+        self.f = f
+        self.remaining = remaining
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def filename_params(download_name):
+    """Content-Disposition filename parameters, with an RFC 5987 filename* for non-ASCII names as send_file does"""
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='!#$&+-.^_`|~')}"}
+    return {'filename': download_name}
+
+
+def iter_chunks(fileobj):
+    """Yield an open stored object in fixed-size chunks, closing it at the end"""
+    try:
+        while True:
+            chunk = fileobj.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def create_storage(config):
+    """Build the storage backend selected by STORAGE_BACKEND ('local' or 's3')"""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 's3':
+        return S3Storage(
+            bucket=config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX', ''),
+            endpoint_url=config.get('S3_ENDPOINT_URL') or None,
+            region=config.get('S3_REGION') or None
+        )
+    if backend == 'local':
+        return LocalStorage({
+            'subtitles': config['UPLOAD_FOLDER'],
+            'derived': config['VIDEO_UPLOAD_FOLDER'],
+        })
+    raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
@@ -0,0 +1,215 @@
+import os
+import re
+import heapq
+import zipfile
+from werkzeug.utils import secure_filename
+
+# RAR support is optional - it needs the rarfile package plus an unrar binary
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+SUBTITLE_EXTENSIONS = ('.srt', '.vtt', '.ass', '.ssa', '.sub')
+CHUNK_SIZE = 64 * 1024
+MAX_MEMBER_SIZE = 20 * 1024 * 1024  # Subtitles are small; anything bigger is junk or a zip bomb
+MAX_MEMBERS = 200  # Best-scoring members kept from one archive
+MAX_TOTAL_SIZE = 50 * 1024 * 1024  # Decompressed bytes extracted from one archive, across all members
+
+ZIP_MAGIC = b'PK\x03\x04'
+RAR_MAGIC = b'Rar!\x1a\x07'
+
+# Language names and codes as they usually appear in subtitle pack filenames
+LANGUAGE_ALIASES = {
+    'English': ('english', 'en', 'eng'),
+    'Spanish': ('spanish', 'es', 'spa', 'esp'),
+    'French': ('french', 'fr', 'fre', 'fra'),
+    'German': ('german', 'de', 'ger', 'deu'),
+    'Italian': ('italian', 'it', 'ita'),
+    'Portuguese': ('portuguese', 'pt', 'por', 'pob', 'ptbr'),
+    'Russian': ('russian', 'ru', 'rus'),
+    'Chinese': ('chinese', 'zh', 'chi', 'zho', 'chs', 'cht'),
+    'Japanese': ('japanese', 'ja', 'jpn'),
+    'Korean': ('korean', 'ko', 'kor'),
+    'Arabic': ('arabic', 'ar', 'ara'),
+    'Hindi': ('hindi', 'hi', 'hin'),
+    'Turkish': ('turkish', 'tr', 'tur'),
+    'Polish': ('polish', 'pl', 'pol'),
+    'Dutch': ('dutch', 'nl', 'dut', 'nld'),
+    'Swedish': ('swedish', 'sv', 'swe'),
+    'Norwegian': ('norwegian', 'no', 'nor'),
+    'Danish': ('danish', 'da', 'dan'),
+    'Finnish': ('finnish', 'fi', 'fin'),
+    'Greek': ('greek', 'el', 'gre', 'ell'),
+    'Hebrew': ('hebrew', 'he', 'heb'),
+    'Thai': ('thai', 'th', 'tha'),
+    'Vietnamese': ('vietnamese', 'vi', 'vie'),
+    'Indonesian': ('indonesian', 'id', 'ind'),
+    'Malay': ('malay', 'ms', 'may', 'msa'),
+}
+LANGUAGE_LOOKUP = {alias: name for name, aliases in LANGUAGE_ALIASES.items() for alias in aliases}
+
+
+def archive_type(path):
+    """Return 'zip', 'rar' or None by sniffing the file header"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(8)
+    except OSError:
+        return None
+    if header.startswith(ZIP_MAGIC):
+        return 'zip'
+    if header.startswith(RAR_MAGIC):
+        return 'rar'
+    return None
+
+
+def is_archive(path):
+    """Check whether a downloaded file is a subtitle archive rather than a subtitle"""
+    return archive_type(path) is not None
+
+
+def open_archive(path):
+    """Open a zip or rar archive; both expose the same infolist()/open() interface"""
+    kind = archive_type(path)
+    if kind == 'zip':
+        return zipfile.ZipFile(path)
+    if kind == 'rar':
+        if rarfile is None:
+            raise ValueError('RAR archives require the rarfile package')
+        return rarfile.RarFile(path)
+    raise ValueError('Not a supported archive')
+
+
+def _tokens(text):
+    return [t for t in re.split(r'[^a-z0-9]+', text.lower()) if t]
+
+
+def guess_member_language(member_name):
+    """Guess a member's language from its filename and folder, e.g. 'Subs/Movie.2010.eng.srt'"""
+    # Tokens closest to the extension are the most reliable language tags
+    for token in reversed(_tokens(os.path.splitext(member_name)[0])):
+        if token in LANGUAGE_LOOKUP:
+            return LANGUAGE_LOOKUP[token]
+    return None
+
+
+def score_member(member_name, language=None, title=None):
+    """Rank a member by how well it matches the requested language and title (higher is better)"""
+    member_language = guess_member_language(member_name)
+    if language and member_language:
+        language_score = 2 if member_language.lower() == language.lower() else 0
+    else:
+        language_score = 1
+
+    title_score = 0
+    if title:
+        title_tokens = set(_tokens(title))
+        if title_tokens:
+            name_tokens = set(_tokens(os.path.basename(member_name)))
+            title_score = len(title_tokens & name_tokens) / len(title_tokens)
+
+    srt_bonus = 1 if member_name.lower().endswith('.srt') else 0
+    return (language_score, title_score, srt_bonus)
+
+
+def list_subtitle_members(archive, language=None, title=None):
+    """
+    Return archive entries that look like subtitle files, skipping folders and junk,
+    best match first. Every entry is scored, so a large pack keeps its top
+    MAX_MEMBERS wherever they sit in the archive.
+    """
+    members = []
+    for info in archive.infolist():
+        name = info.filename
+        if name.endswith('/') or '__MACOSX' in name or os.path.basename(name).startswith('.'):
+            continue
+        if not name.lower().endswith(SUBTITLE_EXTENSIONS):
+            continue
+        if info.file_size > MAX_MEMBER_SIZE:
+            continue
+        members.append(info)
+    return heapq.nlargest(MAX_MEMBERS, members, key=lambda info: score_member(info.filename, language, title))
+
+
+def _copy_member(archive, info, dest_path, max_bytes=MAX_MEMBER_SIZE):
+    """Stream one member to disk in fixed-size chunks, at most max_bytes; returns bytes written"""
+    written = 0
+    with archive.open(info) as src, open(dest_path, 'wb') as dst:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            # The header size can lie, so enforce the limit on what is actually decompressed
+            if written > max_bytes:
+                raise ValueError(f'Archive member too large: {info.filename}')
+            dst.write(chunk)
+    return written
+
+
+def member_filename(member_name, position):
+    """Safe filename for an archive member; names with no ASCII left (e.g. 'Фильм.srt') get a generated one"""
+    stem, ext = os.path.splitext(os.path.basename(member_name))
+    stem = secure_filename(stem)
+    return f"{stem or f'subtitle_{position}'}{ext.lower()}"
+
+
+def extract_subtitles(archive_path, dest_dir, language=None, title=None, prefix='', limit=None):
+    """
+    Extract subtitle members of an archive into dest_dir, best match first
+    (all of them, or only the top `limit`).
+    Members are streamed one at a time so memory stays bounded for large packs, and
+    extraction stops once MAX_TOTAL_SIZE bytes have been written.
+    Returns: list of dicts with filename, filepath, language and file_size
+    """
+    extracted = []
+    total_size = 0
+    with open_archive(archive_path) as archive:
+        members = list_subtitle_members(archive, language, title)
+
+        used_names = set()
+        for position, info in enumerate(members, 1):
+            if limit is not None and len(extracted) >= limit:
+                break
+            remaining = MAX_TOTAL_SIZE - total_size
+            if remaining <= 0:
+                print(f"Archive extraction stopped after {total_size} bytes")
+                break
+            filename = member_filename(info.filename, position)
+
+            # Packs often reuse one basename across language folders
+            base, ext = os.path.splitext(filename)
+            unique_name = filename
+            counter = 1
+            while unique_name in used_names:
+                unique_name = f"{base}_{counter}{ext}"
+                counter += 1
+            used_names.add(unique_name)
+
+            filepath = os.path.join(dest_dir, f"{prefix}{unique_name}")
+            max_bytes = min(MAX_MEMBER_SIZE, remaining)
+            try:
+                file_size = _copy_member(archive, info, filepath, max_bytes)
+            except Exception as e:
+                print(f"Error extracting {info.filename}: {e}")
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                if max_bytes < MAX_MEMBER_SIZE:
+                    # The member ran into the archive-wide budget, not its own limit
+                    break
+                continue
+
+            if file_size == 0:
+                os.remove(filepath)
+                continue
+
+            total_size += file_size
+            extracted.append({
+                'filename': unique_name,
+                'filepath': filepath,
+                'language': guess_member_language(info.filename),
+                'file_size': file_size
+            })
+
+    return extracted
@@ -0,0 +1,70 @@
+import os
+import gzip
+import zlib
+import shutil
+
+# zstd is optional - gzip alone still gives every client a precompressed copy
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+
+# Content-Encoding token -> file suffix, in order of preference when a client accepts several
+ENCODING_SUFFIXES = {
+    'zstd': '.zst',
+    'gzip': '.gz',
+}
+
+
+def compressed_path(filepath, encoding):
+    """Path of the stored copy of filepath in the given Content-Encoding"""
+    return filepath + ENCODING_SUFFIXES[encoding]
+
+
+def compress_subtitle_file(filepath):
+    """
+    Replace a freshly saved subtitle with gzip (and, if available, zstd) copies.
+    Compression happens once here, at ingest, using the highest levels since the
+    files are small and then served many times.
+    Returns: (content_encodings: str, stored_size: int)
+    """
+    encodings = []
+
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        with open(filepath, 'rb') as src, open(compressed_path(filepath, 'zstd'), 'wb') as dst:
+            compressor.copy_stream(src, dst, read_size=CHUNK_SIZE)
+        encodings.append('zstd')
+
+    # gzip is always written: it is also the copy we decompress for clients that accept neither
+    with open(filepath, 'rb') as src, gzip.open(compressed_path(filepath, 'gzip'), 'wb', compresslevel=GZIP_LEVEL) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    encodings.append('gzip')
+
+    os.remove(filepath)
+
+    stored_size = sum(os.path.getsize(compressed_path(filepath, encoding)) for encoding in encodings)
+    return ','.join(encodings), stored_size
+
+
+def iter_decompressed(fileobj):
+    """Stream the original bytes back out of an open gzip copy in fixed-size chunks"""
+    # zlib rather than gzip.GzipFile, so non-seekable streams (e.g. S3 bodies) work too
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        while True:
+            chunk = fileobj.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+        data = decompressor.flush()
+        if data:
+            yield data
+    finally:
+        fileobj.close()
@@ -0,0 +1,44 @@
+"""
+Shared fixtures. The app reads its configuration at import time, so the
+environment is pointed at a throwaway folder before app is imported.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+WORK_DIR = tempfile.mkdtemp(prefix='subtitlefox-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}"
+os.environ['STORAGE_BACKEND'] = 'local'
+for folder in ('UPLOAD_FOLDER', 'VIDEO_UPLOAD_FOLDER', 'TRANSCRIPTION_CACHE_FOLDER'):
+    os.environ[folder] = os.path.join(WORK_DIR, folder.lower())
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from app import app as flask_app, db, upgrade_database  # noqa: E402
+from title_index import TitleTrigramIndex  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The app with empty tables and a fresh title index"""
+    monkeypatch.setattr(app_module, 'title_index', TitleTrigramIndex())
+    with flask_app.app_context():
+        db.drop_all()
+        upgrade_database()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
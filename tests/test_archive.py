@@ -0,0 +1,116 @@
+import os
+import zipfile
+import threading
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+import subtitle_archive
+from subtitle_archive import extract_subtitles, is_archive
+
+SRT = b'1\n00:00:01,000 --> 00:00:03,000\nHello there, this line pads the file past the download check.\n\n' * 3
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return path
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def archive_server(tmp_path):
+    """Stand-in for the Subtitle Cat file host, serving tmp_path over HTTP"""
+    server = HTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_requested_language_wins_over_archive_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(subtitle_archive, 'MAX_MEMBERS', 50)
+    members = {f'French/Movie.{i}.fre.srt': SRT for i in range(120)}
+    members['English/Movie.eng.srt'] = SRT
+    archive_path = make_zip(tmp_path / 'pack.zip', members)
+    dest = tmp_path / 'out'
+    dest.mkdir()
+
+    extracted = extract_subtitles(str(archive_path), str(dest), language='English', title='Movie', limit=1)
+
+    assert [(item['filename'], item['language']) for item in extracted] == [('Movie.eng.srt', 'English')]
+    assert os.listdir(dest) == ['Movie.eng.srt']
+
+
+def test_non_ascii_member_names_get_generated_names(tmp_path):
+    archive_path = make_zip(tmp_path / 'pack.zip', {'Фильм.srt': SRT, 'Subs/Фильм.srt': SRT})
+    dest = tmp_path / 'out'
+    dest.mkdir()
+
+    filenames = sorted(item['filename'] for item in extract_subtitles(str(archive_path), str(dest)))
+
+    assert filenames == ['subtitle_1.srt', 'subtitle_2.srt']
+
+
+def test_extraction_stops_at_total_size_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(subtitle_archive, 'MAX_TOTAL_SIZE', len(SRT) * 3 + 10)
+    archive_path = make_zip(tmp_path / 'pack.zip', {f'Movie.{i}.srt': SRT for i in range(10)})
+    dest = tmp_path / 'out'
+    dest.mkdir()
+
+    extracted = extract_subtitles(str(archive_path), str(dest))
+
+    assert len(extracted) == 3
+    assert sum(item['file_size'] for item in extracted) <= subtitle_archive.MAX_TOTAL_SIZE
+    assert len(os.listdir(dest)) == 3
+
+
+def test_plain_subtitle_is_not_an_archive(tmp_path):
+    path = tmp_path / 'movie.srt'
+    path.write_bytes(SRT)
+    assert not is_archive(str(path))
+
+
+def test_import_stores_one_row_per_archive_member(client, tmp_path, archive_server):
+    make_zip(tmp_path / 'pack.zip', {
+        'Movie.2010.fre.srt': SRT.replace(b'Hello', b'Bonjour'),
+        'Movie.2010.eng.srt': SRT,
+        'readme.txt': b'not a subtitle',
+    })
+
+    response = client.post('/api/import-from-subtitlecat', json={
+        'url': f"{archive_server}/pack.zip",
+        'title': 'Movie',
+        'language': 'English'
+    })
+
+    assert response.status_code == 201
+    subtitles = response.get_json()['subtitles']
+    assert [(item['filename'], item['language']) for item in subtitles] == [
+        ('Movie.2010.eng.srt', 'English'),
+        ('Movie.2010.fre.srt', 'French'),
+    ]
+
+    download = client.get(f"/api/download/{subtitles[1]['id']}", headers={'Accept-Encoding': 'identity'})
+    assert download.status_code == 200
+    assert download.data == SRT.replace(b'Hello', b'Bonjour')
+
+
+def test_download_external_sends_best_member(client, tmp_path, archive_server):
+    make_zip(tmp_path / 'pack.zip', {'Other.Show.srt': SRT.replace(b'Hello', b'Hola'), 'Movie.srt': SRT})
+
+    response = client.post('/api/download-external', json={
+        'download_url': f"{archive_server}/pack.zip",
+        'filename': 'Movie.zip'
+    })
+
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=Movie.srt'
+    assert response.data == SRT
@@ -0,0 +1,63 @@
+from app import db, Subtitle
+from title_index import TitleTrigramIndex
+
+
+def add_subtitles(app, *rows):
+    """rows: (title, year, count, downloads)"""
+    with app.app_context():
+        for title, year, count, downloads in rows:
+            for _ in range(count):
+                db.session.add(Subtitle(
+                    title=title, language='English', year=year, filename=f"{title}.srt",
+                    filepath=f"subtitles/{title}.srt", file_size=100, downloads=downloads
+                ))
+        db.session.commit()
+
+
+def search(client, query):
+    response = client.get('/api/search', query_string={'q': query})
+    assert response.status_code == 200
+    return [(item['title'], item['year']) for item in response.get_json()['results']]
+
+
+def test_exact_title_is_not_crowded_out_by_popular_near_matches(app, client):
+    add_subtitles(app, ('Dark', 2017, 3, 1), ('Dark City', 1998, 150, 100))
+
+    results = search(client, 'Dark')
+
+    assert results[:3] == [('Dark', 2017)] * 3
+
+
+def test_year_that_belongs_to_the_title_ranks_instead_of_filtering(app, client):
+    add_subtitles(app, ('Blade Runner', 1982, 1, 50), ('Blade Runner 2049', 2017, 1, 1))
+
+    assert search(client, 'Blade Runner 2049')[0] == ('Blade Runner 2049', 2017)
+    assert search(client, 'Blade.Runner.2049.1080p.BluRay')[0] == ('Blade Runner 2049', 2017)
+
+
+def test_year_in_a_release_name_still_filters(app, client):
+    add_subtitles(app, ('Dune', 1984, 1, 50), ('Dune', 2021, 1, 1))
+
+    assert search(client, 'Dune.2021.1080p.WEB-DL') == [('Dune', 2021)]
+    assert search(client, 'Dune 2021') == [('Dune', 2021), ('Dune', 1984)]
+
+
+def test_exact_title_survives_many_partial_matches():
+    index = TitleTrigramIndex()
+    for i in range(30000):
+        index.add(f"lost word{i}")
+    index.add('Lost')
+
+    assert index.search('lost')[0] == 'Lost'
+
+
+def test_rows_committed_out_of_order_are_indexed():
+    index = TitleTrigramIndex()
+    index.sync([(1, 'Dark'), (3, 'Lost')])
+    assert index.pending_row_ids() == [2]
+
+    # Row 2's transaction commits after row 3 was seen
+    index.sync([(2, 'Fargo'), (4, 'Ozark')])
+
+    assert index.search('fargo') == ['Fargo']
+    assert index.pending_row_ids() == []
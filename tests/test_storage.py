@@ -0,0 +1,143 @@
+import gzip
+import io
+import os
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from moto import mock_aws
+
+import app as app_module
+from storage import LocalStorage, S3Storage
+
+SRT = ('1\n00:00:01,000 --> 00:00:02,000\nAmélie says hello\n\n' * 40).encode('utf-8')
+BUCKET = 'subtitlefox-test'
+
+
+@pytest.fixture
+def s3_storage(app, monkeypatch):
+    """The app switched to an S3 backend backed by moto's in-process stand-in"""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        storage = S3Storage(BUCKET, prefix='subtitlefox', region='us-east-1')
+        storage.client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(app_module, 'storage', storage)
+        yield storage
+
+
+def upload(client):
+    response = client.post('/api/upload', data={
+        'title': 'Amelie',
+        'language': 'French',
+        'file': (io.BytesIO(SRT), 'amelie.srt')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 201
+    subtitle_id = response.get_json()['subtitle']['id']
+
+    # Uploads are renamed with secure_filename; older rows may hold any name
+    with app_module.app.app_context():
+        subtitle = app_module.db.session.get(app_module.Subtitle, subtitle_id)
+        subtitle.filename = 'Amélie.srt'
+        app_module.db.session.commit()
+    return subtitle_id
+
+
+def stored_key(subtitle_id, encoding):
+    with app_module.app.app_context():
+        filepath = app_module.db.session.get(app_module.Subtitle, subtitle_id).filepath
+    return app_module.compressed_path(filepath, encoding)
+
+
+def test_local_round_trip_and_ranges(client):
+    subtitle_id = upload(client)
+
+    response = client.get(f'/api/download/{subtitle_id}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == SRT
+
+    response = client.get(f'/api/download/{subtitle_id}', headers={'Accept-Encoding': 'identity'})
+    assert response.data == SRT
+    assert response.headers['Content-Length'] == str(len(SRT))
+
+    stored = client.get(f'/api/download/{subtitle_id}', headers={'Accept-Encoding': 'gzip'}).data
+    response = client.get(f'/api/download/{subtitle_id}', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'})
+    assert response.status_code == 206
+    assert response.data == stored[:10]
+
+    response = client.get(f'/api/download/{subtitle_id}', headers={'Accept-Encoding': 'gzip', 'Range': f'bytes={len(stored) + 100}-'})
+    assert response.status_code == 416
+
+
+def test_s3_download_redirects_to_presigned_url(client, s3_storage, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'STORAGE_REDIRECT_DOWNLOADS', True)
+    subtitle_id = upload(client)
+
+    response = client.get(f'/api/download/{subtitle_id}', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 302
+    location = urlparse(response.headers['Location'])
+    params = parse_qs(location.query)
+    assert location.path.endswith('.srt.gz')
+    assert params['response-content-encoding'] == ['gzip']
+    assert params['response-content-disposition'] == [
+        "attachment; filename=Amelie.srt; filename*=UTF-8''Am%C3%A9lie.srt"
+    ]
+
+
+def test_s3_download_streams_with_range_support(client, s3_storage, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'STORAGE_REDIRECT_DOWNLOADS', False)
+    subtitle_id = upload(client)
+    stored = s3_storage.open(stored_key(subtitle_id, 'gzip')).read()
+    url = f'/api/download/{subtitle_id}'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.data == stored
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Disposition'] == "attachment; filename=Amelie.srt; filename*=UTF-8''Am%C3%A9lie.srt"
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'})
+    assert response.status_code == 206
+    assert response.data == stored[:10]
+    assert response.headers['Content-Range'] == f'bytes 0-9/{len(stored)}'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip', 'Range': f'bytes={len(stored) + 100}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(stored)}'
+
+    # Clients that accept neither stored encoding get the original bytes
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert response.data == SRT
+
+
+def test_video_to_srt_stores_only_one_derived_copy(client, s3_storage, monkeypatch):
+    def fake_video_to_srt(video_path, srt_path, language, cache=None):
+        with open(srt_path, 'wb') as f:
+            f.write(SRT)
+        return True, 'ok'
+
+    monkeypatch.setattr(app_module, 'video_to_srt', fake_video_to_srt)
+
+    for _ in range(2):
+        response = client.post('/api/video-to-srt', data={
+            'video': (io.BytesIO(b'\x00' * 1024), 'clip.mp4')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.data == SRT
+
+    keys = [item['Key'] for item in s3_storage.client.list_objects_v2(Bucket=BUCKET)['Contents']]
+    assert len(keys) == 1
+    assert keys[0].startswith('subtitlefox/derived/') and keys[0].endswith('.srt')
+
+
+def test_local_storage_exists_and_ranged_open(tmp_path):
+    storage = LocalStorage({'subtitles': str(tmp_path)})
+    storage.save('subtitles/a.srt', io.BytesIO(SRT))
+
+    assert storage.exists('subtitles/a.srt')
+    assert not storage.exists('subtitles/b.srt')
+    assert os.path.exists(tmp_path / 'a.srt')
+    with storage.open('subtitles/a.srt', 5, 15) as f:
+        assert f.read() == SRT[5:15]
+
@@ -0,0 +1,33 @@
+import os
+
+from transcription_cache import RESCAN_SHARE, TranscriptionCache
+
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def test_round_trip_and_lru_eviction(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), max_bytes=1000)
+    cache.set('chunk', 'first', 'en-US', 'a' * 400)
+    cache.set('chunk', 'second', 'en-US', 'b' * 400)
+    assert cache.get('chunk', 'first', 'en-US') == 'a' * 400  # Refreshes 'first'
+
+    cache.set('chunk', 'third', 'en-US', 'c' * 400)
+
+    assert cache.get('chunk', 'second', 'en-US') is None
+    assert cache.get('chunk', 'first', 'en-US') == 'a' * 400
+    assert cache.get('chunk', 'first', 'fr-FR') is None
+
+
+def test_workers_sharing_a_folder_stay_near_the_limit(tmp_path):
+    # One cache object per gunicorn worker process, all writing to the same folder
+    max_bytes = 100000
+    workers = [TranscriptionCache(str(tmp_path), max_bytes=max_bytes) for _ in range(17)]
+
+    peak = 0
+    for i in range(2500):
+        workers[i % len(workers)].set('chunk', str(i), 'en-US', 'x' * 300)
+        peak = max(peak, folder_size(tmp_path))
+
+    assert peak <= max_bytes * (1 + len(workers) * RESCAN_SHARE)
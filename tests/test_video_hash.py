@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+from video_hash import compute_video_hash, normalize_video_hash, normalize_video_size
+
+SRT = b'1\n00:00:01,000 --> 00:00:02,000\nHello\n'
+VIDEO_HASH = '8e245d9679d31e12'
+
+
+@pytest.fixture
+def subtitle_id(client):
+    response = client.post('/api/upload', data={
+        'title': 'Movie',
+        'file': (io.BytesIO(SRT), 'movie.srt'),
+        'video_hash': VIDEO_HASH,
+        'video_size': '12909756'
+    }, content_type='multipart/form-data')
+    assert response.status_code == 201
+    return response.get_json()['subtitle']['id']
+
+
+def test_compute_video_hash(tmp_path):
+    # size + the 64-bit little-endian words of the first and last 64 KB
+    path = tmp_path / 'video.bin'
+    path.write_bytes(b'\x01' + b'\x00' * (128 * 1024 - 1))
+    assert compute_video_hash(str(path)) == f"{128 * 1024 + 1:016x}"
+
+
+@pytest.mark.parametrize('value', [123, None, ['8e245d9679d31e12'], 'xyz', '8e245d9679d31e1'])
+def test_invalid_hashes_are_rejected(value):
+    assert normalize_video_hash(value) is None
+
+
+@pytest.mark.parametrize('value', [0, -1, 2 ** 63, 10 ** 20, 1.5, True, 'abc', [1]])
+def test_invalid_sizes_are_rejected(value):
+    assert normalize_video_size(value) is None
+
+
+def test_lookup_by_hash(client, subtitle_id):
+    response = client.get('/api/lookup-hash', query_string={'hash': VIDEO_HASH.upper(), 'size': 12909756})
+    assert [item['id'] for item in response.get_json()['results']] == [subtitle_id]
+
+    response = client.get('/api/lookup-hash', query_string={'hash': VIDEO_HASH, 'size': 10 ** 20})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [
+    [1],
+    {'video_hashes': [123]},
+    {'video_hashes': [{'hash': 123}]},
+    {'video_hashes': [{'hash': VIDEO_HASH, 'size': 10 ** 20}]},
+    {'video_hashes': [{'hash': VIDEO_HASH, 'size': -5}]},
+])
+def test_add_video_hashes_rejects_bad_input(client, subtitle_id, body):
+    response = client.post(f'/api/subtitles/{subtitle_id}/video-hashes', json=body)
+    assert response.status_code == 400
+
+
+def test_upload_rejects_oversized_video_size(client):
+    response = client.post('/api/upload', data={
+        'title': 'Movie',
+        'file': (io.BytesIO(SRT), 'movie.srt'),
+        'video_hash': VIDEO_HASH,
+        'video_size': str(10 ** 20)
+    }, content_type='multipart/form-data')
+    assert response.status_code == 400
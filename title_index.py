@@ -0,0 +1,197 @@
+import re
+import time
+import heapq
+import threading
+from array import array
+
+MIN_CONTAINMENT = 0.6  # Share of a query word's trigrams a title word must contain to count as a typo of it
+MIN_RELATIVE_SCORE = 0.5  # Drop titles scoring under half of the best match
+PENDING_ID_SECONDS = 60  # How long a skipped row id is re-checked, in case its transaction commits late
+MAX_GAP = 1000  # Only the ids just below a new row are re-checked; a larger jump is a sequence skip, not concurrency
+
+
+def normalize_title(title):
+    """Lowercase a title and collapse punctuation, so 'Breaking.Bad' and 'breaking bad' are equal"""
+    return ' '.join(t for t in re.split(r'[^a-z0-9]+', title.lower()) if t)
+
+
+def trigrams(word):
+    """pg_trgm-style trigrams of one word, padded with two leading spaces and one trailing space"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleTrigramIndex:
+    """
+    In-memory index over the distinct titles in the catalog, used for
+    typo-tolerant title lookups without scanning the subtitle table.
+
+    Titles are indexed by word, and the (much smaller) set of distinct words is
+    indexed by trigram. A query word that is not in the vocabulary is expanded
+    to the vocabulary words sharing most of its trigrams, then the posting lists
+    of all query words are intersected.
+
+    Titles are only ever added, so sync() pulls in rows newer than the last one
+    seen, which keeps every worker's copy current for the cost of a primary-key range query.
+    Ids can commit out of order (e.g. on Postgres), so ids skipped over are kept in
+    pending_ids and fetched again by later syncs until they show up or time out.
+    """
+
+    def __init__(self):
+        self.normalized = []   # title id -> normalized title
+        self.spellings = []    # title id -> original titles as stored in the database
+        self.title_words = []  # title id -> frozenset of word ids
+        self.title_ids = {}    # normalized title -> title id
+        self.words = []        # word id -> word
+        self.word_ids = {}     # word -> word id
+        self.word_titles = []  # word id -> array of title ids containing the word
+        self.gram_words = {}   # trigram -> array of word ids containing it
+        self.last_row_id = 0
+        self.pending_ids = {}  # skipped row id -> time it was first missed
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.normalized)
+
+    def _word_id(self, word):
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.words.append(word)
+            self.word_ids[word] = word_id
+            self.word_titles.append(array('I'))
+            for gram in trigrams(word):
+                postings = self.gram_words.get(gram)
+                if postings is None:
+                    postings = self.gram_words[gram] = array('I')
+                postings.append(word_id)
+        return word_id
+
+    def add(self, title):
+        normalized = normalize_title(title)
+        if not normalized:
+            return
+        title_id = self.title_ids.get(normalized)
+        if title_id is not None:
+            if title not in self.spellings[title_id]:
+                self.spellings[title_id].append(title)
+            return
+
+        title_id = len(self.normalized)
+        word_ids = frozenset(self._word_id(word) for word in normalized.split())
+        self.normalized.append(normalized)
+        self.spellings.append([title])
+        self.title_words.append(word_ids)
+        self.title_ids[normalized] = title_id
+        for word_id in word_ids:
+            self.word_titles[word_id].append(title_id)
+
+    def sync(self, rows, track_gaps=True):
+        """
+        Add (row_id, title) rows ordered by id, e.g. every Subtitle newer than last_row_id
+        or in pending_row_ids(). With track_gaps, ids skipped over become pending.
+        """
+        with self.lock:
+            now = time.monotonic()
+            for row_id, title in rows:
+                if self.pending_ids.pop(row_id, None) is not None:
+                    self.add(title)
+                    continue
+                if row_id <= self.last_row_id:
+                    continue
+                if track_gaps:
+                    for missing_id in range(max(self.last_row_id + 1, row_id - MAX_GAP), row_id):
+                        self.pending_ids[missing_id] = now
+                self.add(title)
+                self.last_row_id = row_id
+
+    def pending_row_ids(self):
+        """Skipped row ids still worth fetching; ids missing for PENDING_ID_SECONDS were rolled back or deleted"""
+        with self.lock:
+            cutoff = time.monotonic() - PENDING_ID_SECONDS
+            self.pending_ids = {row_id: seen for row_id, seen in self.pending_ids.items() if seen > cutoff}
+            return sorted(self.pending_ids)
+
+    def _expand(self, word, fuzzy):
+        """Map a query word to {word id: similarity} for the vocabulary words it may stand for"""
+        word_id = self.word_ids.get(word)
+        if word_id is not None and not fuzzy:
+            return {word_id: 1.0}
+
+        grams = trigrams(word)
+        # Any word sharing `needed` trigrams must contain one of the rarest
+        # (len - needed + 1), so only those posting lists are read
+        needed = max(1, int(len(grams) * MIN_CONTAINMENT + 0.999))
+        rarest = sorted(grams, key=lambda gram: len(self.gram_words.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:len(grams) - needed + 1]:
+            candidates.update(self.gram_words.get(gram, ()))
+
+        matches = {}
+        for candidate in candidates:
+            candidate_grams = trigrams(self.words[candidate])
+            common = len(grams & candidate_grams)
+            if common >= needed:
+                matches[candidate] = 2 * common / (len(grams) + len(candidate_grams))
+        return matches
+
+    def _candidates(self, expansions):
+        """Title ids containing a match for every query word"""
+        postings = []
+        for expansion in expansions:
+            if not expansion:
+                return set()
+            if len(expansion) == 1:
+                postings.append(self.word_titles[next(iter(expansion))])
+            else:
+                postings.append(set().union(*(self.word_titles[word_id] for word_id in expansion)))
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(other)
+        return candidates
+
+    def search(self, query, limit=10):
+        """
+        Return stored titles matching every word of query, allowing typos, best first.
+        A partial title ('bad') matches longer titles that contain it, ranked lower.
+        """
+        normalized = normalize_title(query)
+        query_words = list(dict.fromkeys(normalized.split()))
+        if not query_words:
+            return []
+
+        expansions = [self._expand(word, fuzzy=word not in self.word_ids) for word in query_words]
+        candidates = self._candidates(expansions)
+        if not candidates:
+            # Every word was in the vocabulary but one of them is a typo of another word
+            expansions = [self._expand(word, fuzzy=True) for word in query_words]
+            candidates = self._candidates(expansions)
+        if not candidates:
+            return []
+
+        exact_id = self.title_ids.get(normalized)
+        exact_words = all(list(expansion.values()) == [1.0] for expansion in expansions)
+
+        def rank(title_id):
+            title_words = self.title_words[title_id]
+            if exact_words:
+                # Every candidate contains every query word, so only the extra words count against it
+                total = len(query_words)
+            else:
+                total = sum(max((expansion.get(word_id, 0) for word_id in title_words), default=0)
+                            for expansion in expansions)
+            return (title_id == exact_id, total / max(len(title_words), len(query_words)), title_id)
+
+        top = heapq.nlargest(limit, map(rank, candidates))
+        best_score = top[0][1]
+
+        titles = []
+        for _, score, title_id in top:
+            if score < best_score * MIN_RELATIVE_SCORE:
+                break
+            titles.extend(self.spellings[title_id])
+        return titles
@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+
+HASH_BLOCK_SIZE = 1024 * 1024
+EVICT_TARGET = 0.9  # Eviction trims to this share of max_bytes, so folder scans stay rare
+RESCAN_SHARE = 0.01  # Rescan after this process writes this share of max_bytes, to pick up other workers' writes
+STALE_TEMP_SECONDS = 3600  # Older temp files are left over from failed writes
+
+
+def file_fingerprint(path):
+    """SHA-256 of a file's bytes, read in blocks so large videos don't load into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def data_fingerprint(data):
+    """SHA-256 of raw bytes, e.g. a chunk of decoded PCM audio"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Persistent on-disk cache of transcription results.
+    Entries are keyed by (kind, fingerprint, language) and evicted least-recently-used
+    first once the folder grows past max_bytes.
+
+    Each process keeps a running total of the folder size, so writes don't rescan
+    it. The folder is scanned on the first write, when the total passes max_bytes,
+    and after every RESCAN_SHARE of max_bytes this process writes, which picks up
+    other workers' writes: with N workers the folder stays under about
+    max_bytes * (1 + N * RESCAN_SHARE).
+    """
+
+    def __init__(self, cache_dir, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = None  # Unknown until the first scan
+        self.written_since_scan = 0
+        self.lock = threading.Lock()
+
+    def _path(self, kind, fingerprint, language):
+        key = hashlib.sha256(f"{kind}:{fingerprint}:{language}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{kind}_{key}.txt")
+
+    def get(self, kind, fingerprint, language):
+        """Return the cached text or None; a hit refreshes the entry's LRU position"""
+        path = self._path(kind, fingerprint, language)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            os.utime(path)
+            return text
+        except OSError:
+            return None
+
+    def set(self, kind, fingerprint, language, text):
+        """Store text atomically, evicting old entries if the cache has outgrown its limit"""
+        path = self._path(kind, fingerprint, language)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                size = os.path.getsize(temp_path)
+                replaced = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(temp_path, path)
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            with self.lock:
+                if self.total_bytes is not None:
+                    self.total_bytes += size - replaced
+                self.written_since_scan += size
+                needs_scan = (
+                    self.total_bytes is None
+                    or self.total_bytes > self.max_bytes
+                    or self.written_since_scan > self.max_bytes * RESCAN_SHARE
+                )
+            if needs_scan:
+                self.evict()
+        except OSError as e:
+            print(f"Error writing transcription cache: {e}")
+
+    def evict(self):
+        """
+        Rescan the folder, then delete least-recently-used entries until the cache
+        is back under EVICT_TARGET of max_bytes. Stale temp files are removed too.
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                    if entry.name.endswith('.tmp'):
+                        # Recent ones may be another worker's write in progress
+                        if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                            os.remove(entry.path)
+                        continue
+                except OSError:
+                    continue  # Removed by another worker meanwhile
+                if not entry.name.endswith('.txt'):
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TARGET
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= target:
+                    break
+
+        with self.lock:
+            self.total_bytes = total
+            self.written_since_scan = 0
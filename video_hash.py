@@ -0,0 +1,78 @@
+"""
+OpenSubtitles-style video file hash
+
+Usage: python video_hash.py <video file> [--server http://localhost:5000]
+"""
+import os
+import re
+import sys
+import struct
+import argparse
+
+HASH_CHUNK_SIZE = 64 * 1024
+VIDEO_HASH_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+MAX_VIDEO_SIZE = 2 ** 63 - 1  # Sizes are stored as a signed 64-bit BIGINT
+
+
+def compute_video_hash(path):
+    """
+    Hash a video from its size plus the 64-bit little-endian words of its first and
+    last 64 KB, so only 128 KB is read however large the file is.
+    Returns: 16 hex characters
+    """
+    size = os.path.getsize(path)
+    if size < HASH_CHUNK_SIZE:
+        raise ValueError('File is too small to hash')
+
+    value = size
+    with open(path, 'rb') as f:
+        for offset in (0, size - HASH_CHUNK_SIZE):
+            f.seek(offset)
+            for (word,) in struct.iter_unpack('<Q', f.read(HASH_CHUNK_SIZE)):
+                value = (value + word) & 0xFFFFFFFFFFFFFFFF
+    return f"{value:016x}"
+
+
+def normalize_video_hash(value):
+    """Return the hash lowercased if it is a string of 16 hex characters, otherwise None"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    return value if VIDEO_HASH_PATTERN.match(value) else None
+
+
+def normalize_video_size(value):
+    """Return a file size as an int if it is a whole number that fits the database column, otherwise None"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return None
+    return size if 0 < size <= MAX_VIDEO_SIZE else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--server', help='Look the hash up on a SubtitleFox server, e.g. http://localhost:5000')
+    args = parser.parse_args()
+
+    video_hash = compute_video_hash(args.video)
+    size = os.path.getsize(args.video)
+    print(f"{video_hash}  {size}  {args.video}")
+
+    if args.server:
+        import requests
+        response = requests.get(
+            f"{args.server.rstrip('/')}/api/lookup-hash",
+            params={'hash': video_hash, 'size': size},
+            timeout=15
+        )
+        response.raise_for_status()
+        for subtitle in response.json()['results']:
+            print(f"  #{subtitle['id']}  {subtitle['language']:<12} {subtitle['filename']}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,15 @@ import subprocess
 import tempfile
 from datetime import timedelta
 import speech_recognition as sr
+from pydub import AudioSegment
+from transcription_cache import file_fingerprint, data_fingerprint
+
+# Audio is transcribed in chunks cut at quiet points, so cached chunks can be
+# reused when the same passage shows up in another file at a different offset
+CHUNK_WINDOW_MS = 100
+MIN_CHUNK_MS = 5000
+MAX_CHUNK_MS = 30000
+SILENCE_THRESHOLD = 328  # Peak sample amplitude, about -40 dBFS for 16-bit audio
 
 def extract_audio_from_video(video_path, audio_path):
     """Extract audio from video file"""
@@ -27,59 +36,126 @@ def extract_audio_from_video(video_path, audio_path):
         print("FFmpeg not found. Please install FFmpeg.")
         return False
 
-def audio_to_text_simple(audio_path, language='en-US'):
-    """Convert audio to text using speech recognition"""
-    recognizer = sr.Recognizer()
+def create_srt_from_segments(segments):
+    """Create an SRT file from (start_seconds, end_seconds, text) segments"""
+    srt_content = []
+    index = 1
     
-    try:
-        # Load audio file
-        audio_file = sr.AudioFile(audio_path)
+    for start_time, end_time, text in segments:
+        sentences = [sentence.strip() for sentence in text.split('. ') if sentence.strip()]
+        if not sentences:
+            continue
         
-        with audio_file as source:
-            audio = recognizer.record(source)
+        # Spread the segment's sentences evenly over its time span
+        time_per_sentence = (end_time - start_time) / len(sentences)
         
-        # Use Google Speech Recognition
-        try:
-            text = recognizer.recognize_google(audio, language=language)
-            return text, True
-        except sr.UnknownValueError:
-            return "Could not understand audio", False
-        except sr.RequestError as e:
-            return f"Error with speech recognition service: {e}", False
+        for i, sentence in enumerate(sentences):
+            if not sentence.endswith('.'):
+                sentence += '.'
             
-    except Exception as e:
-        return f"Error processing audio: {str(e)}", False
+            start_str = format_srt_time(start_time + i * time_per_sentence)
+            end_str = format_srt_time(start_time + (i + 1) * time_per_sentence)
+            
+            srt_content.append(f"{index}\n{start_str} --> {end_str}\n{sentence}\n\n")
+            index += 1
+    
+    return ''.join(srt_content)
 
-def create_srt_from_text(text, duration_seconds=60):
-    """Create a simple SRT file from text"""
-    # Split text into sentences
-    sentences = text.split('. ')
+def split_audio_on_silence(audio):
+    """
+    Split mono audio into (start_sample, end_sample) chunks of sound, dropping the quiet gaps.
+    Chunks start on the exact sample where sound resumes and all later cuts are measured from
+    there, so the same passage is cut identically in every file it appears in.
+    """
+    samples = audio.get_array_of_samples()
+    total = len(samples)
+    window = audio.frame_rate * CHUNK_WINDOW_MS // 1000
+    min_length = audio.frame_rate * MIN_CHUNK_MS // 1000
+    max_length = audio.frame_rate * MAX_CHUNK_MS // 1000
     
-    # Calculate time per sentence
-    time_per_sentence = duration_seconds / len(sentences) if sentences else duration_seconds
+    def is_quiet(position):
+        block = samples[position:position + window]
+        return max(block) <= SILENCE_THRESHOLD and min(block) >= -SILENCE_THRESHOLD
     
-    srt_content = []
-    start_time = 0
+    def next_onset(position):
+        while position < total:
+            if not is_quiet(position):
+                block = samples[position:position + window]
+                for offset, sample in enumerate(block):
+                    if abs(sample) > SILENCE_THRESHOLD:
+                        return position + offset
+            position += window
+        return total
     
-    for i, sentence in enumerate(sentences, 1):
-        if not sentence.strip():
-            continue
-            
-        # Add period if missing
-        if not sentence.endswith('.'):
-            sentence += '.'
-        
-        end_time = start_time + time_per_sentence
-        
-        # Format times
-        start_str = format_srt_time(start_time)
-        end_str = format_srt_time(end_time)
+    chunks = []
+    start = next_onset(0)
+    
+    while start < total:
+        position = start + min_length
+        while position < total and position - start < max_length and not is_quiet(position):
+            position += window
         
-        srt_content.append(f"{i}\n{start_str} --> {end_str}\n{sentence}\n\n")
+        end = min(position, total)
+        chunks.append((start, end))
         
-        start_time = end_time
+        # A forced cut keeps going from the same sample; a quiet cut skips to where sound resumes
+        if end < total and is_quiet(end):
+            start = next_onset(end)
+        else:
+            start = end
     
-    return ''.join(srt_content)
+    return chunks
+
+def transcribe_chunk(recognizer, chunk, language):
+    """Transcribe one audio chunk; silence or music yields an empty string"""
+    audio_data = sr.AudioData(chunk.raw_data, chunk.frame_rate, chunk.sample_width)
+    try:
+        return recognizer.recognize_google(audio_data, language=language)
+    except sr.UnknownValueError:
+        return ''
+
+def transcribe_audio(audio_path, language='en-US', cache=None):
+    """
+    Transcribe a 16kHz mono PCM file chunk by chunk into SRT content.
+    Whole-audio and per-chunk results are looked up in / stored to the cache.
+    Returns: (srt_content or error message, success: bool)
+    """
+    audio = AudioSegment.from_wav(audio_path)
+    
+    # Fingerprint the decoded samples so re-muxed copies of the same audio also hit
+    audio_fingerprint = data_fingerprint(audio.raw_data)
+    if cache:
+        cached = cache.get('audio', audio_fingerprint, language)
+        if cached is not None:
+            print("Transcription found in cache")
+            return cached, True
+    
+    recognizer = sr.Recognizer()
+    segments = []
+    
+    try:
+        for start_sample, end_sample in split_audio_on_silence(audio):
+            chunk = audio.get_sample_slice(start_sample, end_sample)
+            chunk_fingerprint = data_fingerprint(chunk.raw_data)
+            
+            text = cache.get('chunk', chunk_fingerprint, language) if cache else None
+            if text is None:
+                text = transcribe_chunk(recognizer, chunk, language)
+                if cache:
+                    cache.set('chunk', chunk_fingerprint, language, text)
+            
+            segments.append((start_sample / audio.frame_rate, end_sample / audio.frame_rate, text))
+    except sr.RequestError as e:
+        return f"Error with speech recognition service: {e}", False
+    
+    if not any(text for _, _, text in segments):
+        return "Could not understand audio", False
+    
+    srt_content = create_srt_from_segments(segments)
+    if cache:
+        cache.set('audio', audio_fingerprint, language, srt_content)
+    
+    return srt_content, True
 
 def format_srt_time(seconds):
     """Format seconds to SRT time format (HH:MM:SS,mmm)"""
@@ -90,27 +166,22 @@ def format_srt_time(seconds):
     milliseconds = int((td.total_seconds() - total_seconds) * 1000)
     return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
 
-def get_video_duration(video_path):
-    """Get video duration in seconds"""
-    try:
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            video_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-    except:
-        return 60  # Default 60 seconds
-
-def video_to_srt(video_path, output_srt_path, language='en-US'):
+def video_to_srt(video_path, output_srt_path, language='en-US', cache=None):
     """
     Convert video file to SRT subtitle file
+    Pass a TranscriptionCache to reuse results for videos and audio seen before.
     Returns: (success: bool, message: str)
     """
     try:
+        # Identical uploads skip FFmpeg and speech recognition entirely
+        video_fingerprint = file_fingerprint(video_path) if cache else None
+        if cache:
+            cached = cache.get('video', video_fingerprint, language)
+            if cached is not None:
+                with open(output_srt_path, 'w', encoding='utf-8') as f:
+                    f.write(cached)
+                return True, "SRT file loaded from cache"
+        
         # Create temporary audio file
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
             temp_audio_path = temp_audio.name
@@ -121,22 +192,18 @@ def video_to_srt(video_path, output_srt_path, language='en-US'):
             if not extract_audio_from_video(video_path, temp_audio_path):
                 return False, "Failed to extract audio from video. Make sure FFmpeg is installed."
             
-            # Get video duration
-            duration = get_video_duration(video_path)
-            print(f"Video duration: {duration} seconds")
-            
             # Convert audio to text
             print("Converting audio to text...")
-            text, success = audio_to_text_simple(temp_audio_path, language)
+            srt_content, success = transcribe_audio(temp_audio_path, language, cache)
             
             if not success:
-                return False, text
+                return False, srt_content
             
-            # Create SRT file
-            print("Creating SRT file...")
-            srt_content = create_srt_from_text(text, duration)
+            if cache:
+                cache.set('video', video_fingerprint, language, srt_content)
             
             # Save SRT file
+            print("Creating SRT file...")
             with open(output_srt_path, 'w', encoding='utf-8') as f:
                 f.write(srt_content)
             
@@ -149,4 +216,3 @@ def video_to_srt(video_path, output_srt_path, language='en-US'):
                 
     except Exception as e:
         return False, f"Error processing video: {str(e)}"
-